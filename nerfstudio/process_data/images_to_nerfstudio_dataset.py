@@ -32,6 +32,8 @@ class ImagesToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
 
     percent_radius_crop: float = 1.0
     """Create circle crop mask. The radius is the percent of the image diagonal."""
+    raw_half_size: bool = False
+    """Whether to demosaic raw (e.g. CR2) images at half resolution, which is much faster but halves their resolution."""
 
     def main(self) -> None:
         """Process images into a nerfstudio dataset."""
@@ -72,6 +74,7 @@ class ImagesToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                 verbose=self.verbose,
                 num_downscales=self.num_downscales,
                 same_dimensions=self.same_dimensions,
+                raw_half_size=self.raw_half_size,
                 keep_image_dir=False,
             )
             image_rename_map = dict(
@@ -86,6 +89,7 @@ class ImagesToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                     verbose=self.verbose,
                     num_downscales=self.num_downscales,
                     same_dimensions=self.same_dimensions,
+                    raw_half_size=self.raw_half_size,
                     keep_image_dir=True,
                 )
                 eval_image_rename_map = dict(
@@ -14,17 +14,22 @@
 
 """Helper utils for processing data into the nerfstudio format."""
 
+import functools
+import itertools
 import math
+import multiprocessing
+import os
 import random
 import re
 import shutil
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
-from typing import List, Literal, Optional, OrderedDict, Tuple, Union, cast
+from typing import Dict, List, Literal, Optional, OrderedDict, Tuple, Union, cast, get_args
 
 import cv2
-import imageio
 
 try:
     import rawpy
@@ -32,6 +37,7 @@ except ImportError:
     import newrawpy as rawpy  # type: ignore
 
 import numpy as np
+from PIL import Image
 
 from nerfstudio.utils.rich_utils import CONSOLE, status
 from nerfstudio.utils.scripts import run_command
@@ -40,8 +46,13 @@ POLYCAM_UPSCALING_TIMES = 2
 
 """Lowercase suffixes to treat as raw image."""
 ALLOWED_RAW_EXTS = [".cr2"]
+"""Lowercase suffixes to treat as image, as a tuple for use with str.endswith."""
+ALLOWED_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", *ALLOWED_RAW_EXTS)
 """Suffix to use for converted images from raw."""
 RAW_CONVERTED_SUFFIX = ".jpg"
+"""Keyframe interval (in frames) assumed when deciding whether to seek to sampled video frames. Phone videos
+typically have a keyframe every 1-2 seconds."""
+_ASSUMED_KEYFRAME_INTERVAL = 30
 
 
 class CameraModel(Enum):
@@ -72,9 +83,30 @@ def list_images(data: Path, recursive: bool = True) -> List[Path]:
     Returns:
         Paths to images contained in the directory
     """
-    allowed_exts = [".jpg", ".jpeg", ".png", ".tif", ".tiff"] + ALLOWED_RAW_EXTS
-    glob_str = "**/[!.]*" if recursive else "[!.]*"
-    image_paths = sorted([p for p in data.glob(glob_str) if p.suffix.lower() in allowed_exts])
+    image_paths = []
+    # Like globbing, a missing directory has no images rather than raising.
+    if not data.is_dir():
+        return image_paths
+    # Walk with os.scandir, which reuses the directory entry types rather than stat()-ing every path.
+    # Symlinked directories aren't descended into, so symlink loops can't recurse forever, and like globbing,
+    # unreadable directories are skipped.
+    dirs_to_scan = [str(data)]
+    while dirs_to_scan:
+        try:
+            entries = os.scandir(dirs_to_scan.pop())
+        except PermissionError:
+            continue
+        with entries:
+            for entry in entries:
+                if recursive and entry.is_dir(follow_symlinks=False):
+                    dirs_to_scan.append(entry.path)
+                elif (
+                    not entry.name.startswith(".")
+                    and entry.name.lower().endswith(ALLOWED_IMAGE_EXTS)
+                    and entry.is_file()
+                ):
+                    image_paths.append(Path(entry.path))
+    image_paths.sort()
     return image_paths
 
 
@@ -91,15 +123,106 @@ def get_image_filenames(directory: Path, max_num_images: int = -1) -> Tuple[List
     num_orig_images = len(image_paths)
 
     if max_num_images != -1 and num_orig_images > max_num_images:
-        idx = np.round(np.linspace(0, num_orig_images - 1, max_num_images)).astype(int)
+        # Evenly spaced indices in [0, num_orig_images - 1], rounded to the nearest integer.
+        step_num = num_orig_images - 1
+        step_den = max(max_num_images - 1, 1)
+        idx = [(i * step_num + step_den // 2) // step_den for i in range(max_num_images)]
+        image_filenames = [image_paths[i] for i in idx]
     else:
-        idx = np.arange(num_orig_images)
-
-    image_filenames = cast(List[Path], list(np.array(image_paths)[idx]))
+        image_filenames = image_paths
 
     return image_filenames, num_orig_images
 
 
+def _get_ffmpeg_thread_args(single_threaded: bool = False) -> str:
+    """Returns ffmpeg options enabling threaded decoding and filtering on all CPUs.
+
+    Args:
+        single_threaded: If True, restrict ffmpeg to a single thread instead, for commands that are already run in
+            parallel with each other.
+    Returns:
+        The options, to be placed before the input of the ffmpeg command.
+    """
+    if single_threaded:
+        return "-threads 1 -filter_threads 1 -filter_complex_threads 1"
+    num_threads = os.cpu_count() or 1
+    return f"-filter_threads {num_threads} -filter_complex_threads {num_threads} -threads 0 -thread_type slice+frame"
+
+
+@functools.lru_cache(maxsize=None)
+def _probe_video_stream(video: Path, mtime_ns: int, size: int) -> Dict[str, str]:
+    """Reads the video stream header with ffprobe, cached by the video path, modification time and size."""
+    cmd = f'ffprobe -v error -select_streams v:0 \
+            -show_entries stream=nb_frames,avg_frame_rate,r_frame_rate,duration -of default=noprint_wrappers=1 "{video}"'
+    output = run_command(cmd)
+    assert output is not None
+    return dict(line.strip().split("=", 1) for line in output.splitlines() if "=" in line)
+
+
+def _parse_frame_rate(stream_info: Dict[str, str], key: str = "avg_frame_rate") -> Optional[float]:
+    """Returns a frame rate (by default the average one) of a probed video stream, or None if it is unknown."""
+    try:
+        numerator, _, denominator = stream_info[key].partition("/")
+        frame_rate = float(numerator) / float(denominator or 1)
+    except (KeyError, ValueError, ZeroDivisionError):
+        return None
+    return frame_rate if frame_rate > 0 else None
+
+
+def _get_constant_frame_rate(video: Path) -> Optional[float]:
+    """Returns the frame rate of a video if it is constant, or None if it is variable or unknown.
+
+    Variable frame rate videos (common from phones) are detected by their average frame rate differing from their
+    base frame rate (r_frame_rate).
+    """
+    video_stat = video.stat()
+    stream_info = _probe_video_stream(video, video_stat.st_mtime_ns, video_stat.st_size)
+    frame_rate = _parse_frame_rate(stream_info)
+    base_frame_rate = _parse_frame_rate(stream_info, "r_frame_rate")
+    if frame_rate is None or base_frame_rate is None or not math.isclose(frame_rate, base_frame_rate, rel_tol=1e-3):
+        return None
+    return frame_rate
+
+
+def _get_crop_filter(crop_factor: Tuple[float, float, float, float]) -> str:
+    """Returns the ffmpeg crop filter for a crop factor, or an empty string if no cropping is performed.
+
+    Args:
+        crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
+    Returns:
+        The crop filter.
+    """
+    if crop_factor == (0.0, 0.0, 0.0, 0.0):
+        return ""
+    height = 1 - crop_factor[0] - crop_factor[1]
+    width = 1 - crop_factor[2] - crop_factor[3]
+    start_x = crop_factor[2]
+    start_y = crop_factor[0]
+    return f"crop=w=iw*{width}:h=ih*{height}:x=iw*{start_x}:y=ih*{start_y}"
+
+
+@functools.lru_cache(maxsize=8)
+def _get_downscale_filter(num_downscales: int, nearest_neighbor: bool = False) -> str:
+    """Returns the ffmpeg filter splitting its input into outputs [out0], [out1], ... downscaled by 2 each time.
+
+    Args:
+        num_downscales: Number of times to downscale the images. Downscales by 2 each time.
+        nearest_neighbor: Use nearest neighbor sampling (useful for depth images), otherwise area averaging.
+    Returns:
+        The downscale filter.
+    """
+    scale_flags = "neighbor" if nearest_neighbor else "area"
+    downscale_chains = [
+        f"[t{i}]scale=iw/{2**i}:ih/{2**i}:flags={scale_flags}[out{i}]" for i in range(num_downscales + 1)
+    ]
+    return (
+        f"split={num_downscales + 1}"
+        + "".join([f"[t{i}]" for i in range(num_downscales + 1)])
+        + ";"
+        + ";".join(downscale_chains)
+    )
+
+
 def get_num_frames_in_video(video: Path) -> int:
     """Returns the number of frames in a video.
 
@@ -109,6 +232,31 @@ def get_num_frames_in_video(video: Path) -> int:
     Returns:
         The number of frames in a video.
     """
+    video_stat = video.stat()
+    return _get_num_frames_in_video(video, video_stat.st_mtime_ns, video_stat.st_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_num_frames_in_video(video: Path, mtime_ns: int, size: int) -> int:
+    """Cached implementation of get_num_frames_in_video, keyed by the video path, modification time and size.
+
+    The frame count is read from the stream header when available, which avoids scanning the whole file.
+    """
+    stream_info = _probe_video_stream(video, mtime_ns, size)
+
+    nb_frames = stream_info.get("nb_frames", "N/A")
+    if nb_frames.isdigit() and int(nb_frames) > 0:
+        return int(nb_frames)
+
+    frame_rate = _parse_frame_rate(stream_info)
+    try:
+        duration = float(stream_info["duration"])
+    except (KeyError, ValueError):
+        duration = 0.0
+    if frame_rate is not None and duration > 0:
+        return round(duration * frame_rate)
+
+    # Fall back to counting the packets, which requires reading the entire file.
     cmd = f'ffprobe -v error -select_streams v:0 -count_packets \
             -show_entries stream=nb_read_packets -of csv=p=0 "{video}"'
     output = run_command(cmd)
@@ -171,34 +319,27 @@ def convert_video_to_images(
             sys.exit(1)
         CONSOLE.print("Number of frames in video:", num_frames)
 
-        ffmpeg_cmd = f'ffmpeg -i "{video_path}"'
+        ffmpeg_cmd = f'ffmpeg {_get_ffmpeg_thread_args()} -i "{video_path}"'
 
-        crop_cmd = ""
-        if crop_factor != (0.0, 0.0, 0.0, 0.0):
-            height = 1 - crop_factor[0] - crop_factor[1]
-            width = 1 - crop_factor[2] - crop_factor[3]
-            start_x = crop_factor[2]
-            start_y = crop_factor[0]
-            crop_cmd = f"crop=w=iw*{width}:h=ih*{height}:x=iw*{start_x}:y=ih*{start_y},"
+        crop_filter = _get_crop_filter(crop_factor)
+        crop_cmd = f"{crop_filter}," if crop_filter else ""
 
-        downscale_chains = [f"[t{i}]scale=iw/{2**i}:ih/{2**i}[out{i}]" for i in range(num_downscales + 1)]
         downscale_dirs = [Path(str(image_dir) + (f"_{2**i}" if i > 0 else "")) for i in range(num_downscales + 1)]
         downscale_paths = [downscale_dirs[i] / f"{image_prefix}%05d.png" for i in range(num_downscales + 1)]
 
         for dir in downscale_dirs:
             dir.mkdir(parents=True, exist_ok=True)
 
-        downscale_chain = (
-            f"split={num_downscales + 1}"
-            + "".join([f"[t{i}]" for i in range(num_downscales + 1)])
-            + ";"
-            + ";".join(downscale_chains)
-        )
+        downscale_chain = _get_downscale_filter(num_downscales)
 
         ffmpeg_cmd += " -vsync vfr"
 
         # Evenly distribute frame selection if random seed does not exist
         spacing = num_frames // num_frames_target
+        # Each seek decodes from the preceding keyframe and starts its own ffmpeg process, so seeking only beats the
+        # single decode of the whole video with the select filter when the selected frames are sparse.
+        seek_to_frames = bool(random_seed) and num_frames_target * _ASSUMED_KEYFRAME_INTERVAL < num_frames
+        frame_rate = _get_constant_frame_rate(video_path) if seek_to_frames else None
         if random_seed:
             random.seed(random_seed)
             frame_indices = sorted(random.sample(range(num_frames), num_frames_target))
@@ -212,15 +353,43 @@ def convert_video_to_images(
             ffmpeg_cmd += " -pix_fmt bgr8"
             select_cmd = ""
 
-        downscale_cmd = f' -filter_complex "{select_cmd}{crop_cmd}{downscale_chain}"' + "".join(
-            [f' -map "[out{i}]" "{downscale_paths[i]}"' for i in range(num_downscales + 1)]
-        )
+        if seek_to_frames and frame_rate is not None:
+            # Rather than decoding the whole video to select a few frames, seek to each selected frame so that only
+            # the frames from its preceding keyframe onwards are decoded. Seeking half a frame early guards against
+            # rounding errors in the seek timestamp. Frame times are only known from their indices at a constant frame
+            # rate, so variable frame rate videos use the select filter instead. The frames are extracted in parallel,
+            # so each ffmpeg process is kept to a single thread.
+            def extract_frame(framenum: int, frame_index: int) -> None:
+                seek_time = max(frame_index - 0.5, 0) / frame_rate
+                frame_cmd = (
+                    f'ffmpeg {_get_ffmpeg_thread_args(single_threaded=True)} -ss {seek_time:.6f} -i "{video_path}"'
+                    + f' -filter_complex "{crop_cmd}{downscale_chain}"'
+                    + "".join(
+                        [
+                            f' -map "[out{i}]" -frames:v 1 -start_number {framenum}'
+                            + f' -compression_level 1 "{downscale_paths[i]}"'
+                            for i in range(num_downscales + 1)
+                        ]
+                    )
+                )
+                run_command(frame_cmd, verbose=verbose)
+
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                list(executor.map(extract_frame, range(1, len(frame_indices) + 1), frame_indices))
+        else:
+            # The lowest PNG compression level keeps frames lossless while spending far less time in deflate.
+            downscale_cmd = f' -filter_complex "{select_cmd}{crop_cmd}{downscale_chain}"' + "".join(
+                [f' -map "[out{i}]" -compression_level 1 "{downscale_paths[i]}"' for i in range(num_downscales + 1)]
+            )
 
-        ffmpeg_cmd += downscale_cmd
+            ffmpeg_cmd += downscale_cmd
 
-        run_command(ffmpeg_cmd, verbose=verbose)
+            run_command(ffmpeg_cmd, verbose=verbose)
 
-        num_final_frames = len(list(image_dir.glob("*.png")))
+        with os.scandir(image_dir) as entries:
+            num_final_frames = sum(
+                1 for entry in entries if entry.name.endswith(".png") and not entry.name.startswith(".")
+            )
         summary_log = []
         summary_log.append(f"Starting with {num_frames} video frames")
         summary_log.append(f"We extracted {num_final_frames} images with prefix '{image_prefix}'")
@@ -229,6 +398,157 @@ def convert_video_to_images(
         return summary_log, num_final_frames
 
 
+def _group_images_by_size(image_paths: List[Path]) -> List[List[Path]]:
+    """Groups images by their dimensions and suffix, preserving the input order within each group.
+
+    Args:
+        image_paths: Paths of the images to group.
+    Returns:
+        Lists of image paths sharing the same (width, height) and (lowercase) suffix, so each group can be decoded
+        through the concat demuxer and encoded back to its own format.
+    """
+    groups: Dict[Tuple[Tuple[int, int], str], List[Path]] = {}
+    for image_path in image_paths:
+        with Image.open(image_path) as im:
+            groups.setdefault((im.size, image_path.suffix.lower()), []).append(image_path)
+    return list(groups.values())
+
+
+def _escape_concat_path(path: Path) -> str:
+    """Escapes a path for use in a ffmpeg concat demuxer list file."""
+    return str(path.absolute()).replace("'", "'\\''")
+
+
+def _copy_file(src: Path, dst: Path) -> None:
+    """Copies the contents of a file, skipping its metadata. Uses the in-kernel copy_file_range where available.
+
+    Args:
+        src: Path of the file to copy.
+        dst: Path to copy the file to.
+    """
+    if hasattr(os, "copy_file_range"):
+        if dst.exists() and os.path.samefile(src, dst):
+            raise shutil.SameFileError(f"{src} and {dst} are the same file")
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        # Nothing more could be copied, e.g. the source shrank; redo it with a regular copy.
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                return
+        except OSError:
+            # e.g. unsupported by the filesystem or kernel; fall back to a regular copy.
+            pass
+    shutil.copyfile(src, dst)
+
+
+def _copy_image(
+    image_path: Path, copied_image_stem: Path, same_dimensions: bool, verbose: bool, raw_half_size: bool = False
+) -> Path:
+    """Copies a single image, converting raw images and optionally applying autorotation.
+
+    Args:
+        image_path: Path of the image to copy.
+        copied_image_stem: Output path of the copied image, without suffix.
+        same_dimensions: If False, let ffmpeg perform autorotation (and clear metadata).
+        verbose: If True, print extra logging.
+        raw_half_size: If True, demosaic raw images at half resolution, which is roughly 4x faster.
+    Returns:
+        The path of the copied image.
+    """
+    copied_image_path = Path(f"{copied_image_stem}{image_path.suffix}")
+    try:
+        # if CR2 raw, we want to read raw and write RAW_CONVERTED_SUFFIX, and change the file suffix for downstream processing
+        if image_path.suffix.lower() in ALLOWED_RAW_EXTS:
+            copied_image_path = Path(f"{copied_image_stem}{RAW_CONVERTED_SUFFIX}")
+            with rawpy.imread(str(image_path)) as raw:
+                rgb = raw.postprocess(half_size=raw_half_size)
+            if not cv2.imwrite(
+                str(copied_image_path), cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 95]
+            ):
+                CONSOLE.print(f"[bold red]Error: Could not write converted raw image: {copied_image_path}")
+                sys.exit(1)
+        elif same_dimensions:
+            # Fast path; just copy the file
+            _copy_file(image_path, copied_image_path)
+        else:
+            # Slow path; let ffmpeg perform autorotation (and clear metadata). Images are copied in parallel, so each
+            # ffmpeg process is kept to a single thread.
+            ffmpeg_cmd = (
+                f"ffmpeg -y {_get_ffmpeg_thread_args(single_threaded=True)} -i {image_path} "
+                f"-metadata:s:v:0 rotate=0 {copied_image_path}"
+            )
+            if verbose:
+                CONSOLE.log(f"... {ffmpeg_cmd}")
+            run_command(ffmpeg_cmd, verbose=verbose)
+    except shutil.SameFileError:
+        pass
+    return copied_image_path
+
+
+def _downscale_image(
+    image_path: Path,
+    output_paths: List[Path],
+    downscale_factors: List[int],
+    nearest_neighbor: bool = False,
+    crop_border_pixels: Optional[int] = None,
+    crop_factor: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0),
+    upscale_factor: Optional[int] = None,
+) -> None:
+    """Crops and rescales an image in-process, writing one output per downscale factor.
+
+    Args:
+        image_path: Path to the image to downscale.
+        output_paths: Output path for each downscale factor.
+        downscale_factors: Factors to downscale the (upscaled and cropped) image by.
+        nearest_neighbor: Use nearest neighbor sampling (useful for depth images).
+        crop_border_pixels: If not None, crops each edge by the specified number of pixels.
+        crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
+        upscale_factor: If not None, upscales the image with nearest neighbor sampling before cropping.
+    """
+    image = cv2.imread(str(image_path), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        CONSOLE.print(f"[bold red]Error: Could not read image: {image_path}")
+        sys.exit(1)
+    modified = False
+    if upscale_factor is not None:
+        height, width = image.shape[:2]
+        image = cv2.resize(image, (width * upscale_factor, height * upscale_factor), interpolation=cv2.INTER_NEAREST)
+        modified = True
+
+    height, width = image.shape[:2]
+    if crop_border_pixels is not None:
+        image = image[crop_border_pixels : height - crop_border_pixels, crop_border_pixels : width - crop_border_pixels]
+        modified = True
+    elif crop_factor != (0.0, 0.0, 0.0, 0.0):
+        top = int(height * crop_factor[0])
+        left = int(width * crop_factor[2])
+        crop_height = int(height * (1 - crop_factor[0] - crop_factor[1]))
+        crop_width = int(width * (1 - crop_factor[2] - crop_factor[3]))
+        image = image[top : top + crop_height, left : left + crop_width]
+        modified = True
+
+    height, width = image.shape[:2]
+    interpolation = cv2.INTER_NEAREST if nearest_neighbor else cv2.INTER_AREA
+    for downscale_factor, output_path in zip(downscale_factors, output_paths):
+        if downscale_factor == 1:
+            if output_path == image_path and not modified:
+                continue
+            image_i = image
+        else:
+            image_i = cv2.resize(
+                image, (width // downscale_factor, height // downscale_factor), interpolation=interpolation
+            )
+        params = [cv2.IMWRITE_JPEG_QUALITY, 95] if output_path.suffix.lower() in (".jpg", ".jpeg") else []
+        if not cv2.imwrite(str(output_path), image_i, params):
+            CONSOLE.print(f"[bold red]Error: Could not write image: {output_path}")
+            sys.exit(1)
+
+
 def copy_images_list(
     image_paths: List[Path],
     image_dir: Path,
@@ -241,6 +561,8 @@ def copy_images_list(
     upscale_factor: Optional[int] = None,
     nearest_neighbor: bool = False,
     same_dimensions: bool = True,
+    use_ffmpeg: bool = False,
+    raw_half_size: bool = False,
 ) -> List[Path]:
     """Copy all images in a list of Paths. Useful for filtering from a directory.
     Args:
@@ -252,6 +574,8 @@ def copy_images_list(
         crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
         verbose: If True, print extra logging.
         keep_image_dir: If True, don't delete the output directory if it already exists.
+        use_ffmpeg: If True, crop and downscale with ffmpeg instead of in-process with OpenCV.
+        raw_half_size: If True, demosaic raw images at half resolution, which is roughly 4x faster.
     Returns:
         A list of the copied image Paths.
     """
@@ -266,82 +590,121 @@ def copy_images_list(
                 shutil.rmtree(dir_to_remove, ignore_errors=True)
     image_dir.mkdir(exist_ok=True, parents=True)
 
-    copied_image_paths = []
-
     # Images should be 1-indexed for the rest of the pipeline.
-    for idx, image_path in enumerate(image_paths):
-        if verbose:
-            CONSOLE.log(f"Copying image {idx + 1} of {len(image_paths)}...")
-        copied_image_path = image_dir / f"{image_prefix}{idx + 1:05d}{image_path.suffix}"
-        try:
-            # if CR2 raw, we want to read raw and write RAW_CONVERTED_SUFFIX, and change the file suffix for downstream processing
-            if image_path.suffix.lower() in ALLOWED_RAW_EXTS:
-                copied_image_path = image_dir / f"{image_prefix}{idx + 1:05d}{RAW_CONVERTED_SUFFIX}"
-                with rawpy.imread(str(image_path)) as raw:
-                    rgb = raw.postprocess()
-                imageio.imsave(copied_image_path, rgb)
-                image_paths[idx] = copied_image_path
-            elif same_dimensions:
-                # Fast path; just copy the file
-                shutil.copy(image_path, copied_image_path)
-            else:
-                # Slow path; let ffmpeg perform autorotation (and clear metadata)
-                ffmpeg_cmd = f"ffmpeg -y -i {image_path} -metadata:s:v:0 rotate=0 {copied_image_path}"
+    # Raw demosaicing is CPU-bound so it runs on a process pool; plain copies and ffmpeg calls only need threads.
+    # The process pool gets an explicit context so that creating it doesn't fix the global start method (the
+    # datamanagers set it to "spawn" later); its workers are only started if there are raw images.
+    is_raw = [image_path.suffix.lower() in ALLOWED_RAW_EXTS for image_path in image_paths]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        with ProcessPoolExecutor(
+            max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+        ) as raw_executor:
+            futures = []
+            for idx, image_path in enumerate(image_paths):
+                copied_image_stem = image_dir / f"{image_prefix}{idx + 1:05d}"
+                futures.append(
+                    (raw_executor if is_raw[idx] else executor).submit(
+                        _copy_image, image_path, copied_image_stem, same_dimensions, verbose, raw_half_size
+                    )
+                )
+            copied_image_paths = []
+            for idx, future in enumerate(futures):
+                copied_image_paths.append(future.result())
                 if verbose:
-                    CONSOLE.log(f"... {ffmpeg_cmd}")
-                run_command(ffmpeg_cmd, verbose=verbose)
-        except shutil.SameFileError:
-            pass
-        copied_image_paths.append(copied_image_path)
+                    CONSOLE.log(f"Copied image {idx + 1} of {len(image_paths)}")
+
+    # Raw images were converted, so point downstream processing at the converted files.
+    for idx in range(len(image_paths)):
+        if is_raw[idx]:
+            image_paths[idx] = copied_image_paths[idx]
 
-    nn_flag = "" if not nearest_neighbor else ":flags=neighbor"
-    downscale_chains = [f"[t{i}]scale=iw/{2**i}:ih/{2**i}{nn_flag}[out{i}]" for i in range(num_downscales + 1)]
     downscale_dirs = [Path(str(image_dir) + (f"_{2**i}" if i > 0 else "")) for i in range(num_downscales + 1)]
 
     for dir in downscale_dirs:
         dir.mkdir(parents=True, exist_ok=True)
 
-    downscale_chain = (
-        f"split={num_downscales + 1}"
-        + "".join([f"[t{i}]" for i in range(num_downscales + 1)])
-        + ";"
-        + ";".join(downscale_chains)
-    )
+    downscale_chain = _get_downscale_filter(num_downscales, nearest_neighbor)
 
-    num_frames = len(image_paths)
-    # ffmpeg batch commands assume all images are the same dimensions.
-    # When this is not the case (e.g. mixed portrait and landscape images), we need to do individually.
-    # (Unfortunately, that is much slower.)
-    for framenum in range(1, (1 if same_dimensions else num_frames) + 1):
-        framename = f"{image_prefix}%05d" if same_dimensions else f"{image_prefix}{framenum:05d}"
-        ffmpeg_cmd = f'ffmpeg -y -noautorotate -i "{image_dir / f"{framename}{copied_image_paths[0].suffix}"}" '
-
-        crop_cmd = ""
-        if crop_border_pixels is not None:
-            crop_cmd = f"crop=iw-{crop_border_pixels * 2}:ih-{crop_border_pixels * 2}[cropped];[cropped]"
-        elif crop_factor != (0.0, 0.0, 0.0, 0.0):
-            height = 1 - crop_factor[0] - crop_factor[1]
-            width = 1 - crop_factor[2] - crop_factor[3]
-            start_x = crop_factor[2]
-            start_y = crop_factor[0]
-            crop_cmd = f"crop=w=iw*{width}:h=ih*{height}:x=iw*{start_x}:y=ih*{start_y}[cropped];[cropped]"
-
-        select_cmd = "[0:v]"
-        if upscale_factor is not None:
-            select_cmd = f"[0:v]scale=iw*{upscale_factor}:ih*{upscale_factor}:flags=neighbor[upscaled];[upscaled]"
-
-        downscale_cmd = f' -filter_complex "{select_cmd}{crop_cmd}{downscale_chain}"' + "".join(
-            [
-                f' -map "[out{i}]" -q:v 2 "{downscale_dirs[i] / f"{framename}{copied_image_paths[0].suffix}"}"'
-                for i in range(num_downscales + 1)
-            ]
-        )
+    crop_cmd = ""
+    if crop_border_pixels is not None:
+        crop_cmd = f"crop=iw-{crop_border_pixels * 2}:ih-{crop_border_pixels * 2}[cropped];[cropped]"
+    elif crop_factor != (0.0, 0.0, 0.0, 0.0):
+        crop_cmd = f"{_get_crop_filter(crop_factor)}[cropped];[cropped]"
+
+    select_cmd = "[0:v]"
+    if upscale_factor is not None:
+        select_cmd = f"[0:v]scale=iw*{upscale_factor}:ih*{upscale_factor}:flags=neighbor[upscaled];[upscaled]"
 
-        ffmpeg_cmd += downscale_cmd
+    filter_cmd = f' -filter_complex "{select_cmd}{crop_cmd}{downscale_chain}"'
+
+    def run_downscale(input_cmd: str, output_dirs: List[Path], framename: str, single_threaded: bool = False) -> None:
+        thread_args = _get_ffmpeg_thread_args(single_threaded)
+        ffmpeg_cmd = f"ffmpeg -y {thread_args} -noautorotate {input_cmd}{filter_cmd}" + "".join(
+            [f' -map "[out{i}]" -q:v 2 "{output_dirs[i] / framename}"' for i in range(num_downscales + 1)]
+        )
         if verbose:
             CONSOLE.log(f"... {ffmpeg_cmd}")
         run_command(ffmpeg_cmd, verbose=verbose)
 
+    num_frames = len(image_paths)
+    if (
+        not use_ffmpeg
+        and num_downscales == 0
+        and upscale_factor is None
+        and crop_border_pixels is None
+        and crop_factor == (0.0, 0.0, 0.0, 0.0)
+    ):
+        # Without cropping or rescaling the copies are already final, so don't decode them just to skip them.
+        pass
+    elif not use_ffmpeg:
+        # Resizing in-process avoids paying ffmpeg's startup cost for every image.
+        downscale_factors = [2**i for i in range(num_downscales + 1)]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(
+                executor.map(
+                    lambda image_path: _downscale_image(
+                        image_path,
+                        [dir / image_path.name for dir in downscale_dirs],
+                        downscale_factors,
+                        nearest_neighbor=nearest_neighbor,
+                        crop_border_pixels=crop_border_pixels,
+                        crop_factor=crop_factor,
+                        upscale_factor=upscale_factor,
+                    ),
+                    copied_image_paths,
+                )
+            )
+    elif same_dimensions and num_frames > 0:
+        # ffmpeg batch commands assume all images are the same dimensions.
+        suffix = copied_image_paths[0].suffix
+        framename = f"{image_prefix}%05d{suffix}"
+        run_downscale(f'-i "{image_dir / framename}"', downscale_dirs, framename)
+    elif not same_dimensions:
+        # When this is not the case (e.g. mixed portrait and landscape images), batch the images that share
+        # dimensions and format through the concat demuxer and only fall back to one ffmpeg call per image for
+        # singletons.
+        # Outputs are staged in a temporary directory since ffmpeg refuses to overwrite its own input. The groups run in
+        # parallel, so each ffmpeg process is kept to a single thread.
+        def downscale_group(group: List[Path]) -> None:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                if len(group) == 1:
+                    input_cmd = f'-i "{group[0]}"'
+                else:
+                    list_path = Path(tmpdir) / "images.txt"
+                    list_path.write_text("".join(f"file '{_escape_concat_path(p)}'\n" for p in group))
+                    input_cmd = f'-f concat -safe 0 -i "{list_path}" -vsync passthrough'
+                tmp_dirs = [Path(tmpdir) / f"out{i}" for i in range(num_downscales + 1)]
+                for dir in tmp_dirs:
+                    dir.mkdir()
+                suffix = group[0].suffix
+                run_downscale(input_cmd, tmp_dirs, f"%05d{suffix}", single_threaded=True)
+                for i in range(num_downscales + 1):
+                    for framenum, image_path in enumerate(group, start=1):
+                        shutil.move(str(tmp_dirs[i] / f"{framenum:05d}{suffix}"), downscale_dirs[i] / image_path.name)
+
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(executor.map(downscale_group, _group_images_by_size(copied_image_paths)))
+
     if num_frames == 0:
         CONSOLE.log("[bold red]:skull: No usable images in the data folder.")
     else:
@@ -403,6 +766,8 @@ def copy_images(
     crop_factor: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0),
     num_downscales: int = 0,
     same_dimensions: bool = True,
+    use_ffmpeg: bool = False,
+    raw_half_size: bool = False,
 ) -> OrderedDict[Path, Path]:
     """Copy images from a directory to a new directory.
 
@@ -413,6 +778,8 @@ def copy_images(
         verbose: If True, print extra logging.
         crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
         keep_image_dir: If True, don't delete the output directory if it already exists.
+        use_ffmpeg: If True, crop and downscale with ffmpeg instead of in-process with OpenCV.
+        raw_half_size: If True, demosaic raw images at half resolution, which is roughly 4x faster.
     Returns:
         The mapping from the original filenames to the new ones.
     """
@@ -432,6 +799,8 @@ def copy_images(
             keep_image_dir=keep_image_dir,
             num_downscales=num_downscales,
             same_dimensions=same_dimensions,
+            use_ffmpeg=use_ffmpeg,
+            raw_half_size=raw_half_size,
         )
         return OrderedDict((original_path, new_path) for original_path, new_path in zip(image_paths, copied_images))
 
@@ -444,7 +813,7 @@ def downscale_images(
     verbose: bool = False,
 ) -> str:
     """(Now deprecated; much faster integrated into copy_images.)
-    Downscales the images in the directory. Uses FFMPEG.
+    Downscales the images in the directory. Uses OpenCV.
 
     Args:
         image_dir: Path to the directory containing the images.
@@ -466,22 +835,25 @@ def downscale_images(
         verbose=verbose,
     ):
         downscale_factors = [2**i for i in range(num_downscales + 1)[1:]]
+        downscale_dirs = []
         for downscale_factor in downscale_factors:
             assert downscale_factor > 1
             assert isinstance(downscale_factor, int)
             downscale_dir = image_dir.parent / f"{folder_name}_{downscale_factor}"
             downscale_dir.mkdir(parents=True, exist_ok=True)
-            # Using %05d ffmpeg commands appears to be unreliable (skips images).
-            for f in list_images(image_dir):
-                filename = f.name
-                nn_flag = "" if not nearest_neighbor else ":flags=neighbor"
-                ffmpeg_cmd = [
-                    f'ffmpeg -y -noautorotate -i "{image_dir / filename}" ',
-                    f"-q:v 2 -vf scale=iw/{downscale_factor}:ih/{downscale_factor}{nn_flag} ",
-                    f'"{downscale_dir / filename}"',
-                ]
-                ffmpeg_cmd = " ".join(ffmpeg_cmd)
-                run_command(ffmpeg_cmd, verbose=verbose)
+            downscale_dirs.append(downscale_dir)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(
+                executor.map(
+                    lambda image_path: _downscale_image(
+                        image_path,
+                        [dir / image_path.name for dir in downscale_dirs],
+                        downscale_factors,
+                        nearest_neighbor=nearest_neighbor,
+                    ),
+                    list_images(image_dir),
+                )
+            )
 
     CONSOLE.log("[bold green]:tada: Done downscaling images.")
     downscale_text = [f"[bold blue]{2 ** (i + 1)}x[/bold blue]" for i in range(num_downscales)]
@@ -489,33 +861,35 @@ def downscale_images(
     return f"We downsampled the images by {downscale_text}"
 
 
-def find_tool_feature_matcher_combination(
-    sfm_tool: Literal["any", "colmap", "hloc"],
-    feature_type: Literal[
-        "any",
-        "sift",
-        "superpoint",
-        "superpoint_aachen",
-        "superpoint_max",
-        "superpoint_inloc",
-        "r2d2",
-        "d2net-ss",
-        "sosnet",
-        "disk",
-    ],
-    matcher_type: Literal[
-        "any",
-        "NN",
-        "superglue",
-        "superglue-fast",
-        "NN-superpoint",
-        "NN-ratio",
-        "NN-mutual",
-        "adalam",
-        "disk+lightglue",
-        "superpoint+lightglue",
-    ],
-) -> Union[
+SfmTool = Literal["any", "colmap", "hloc"]
+"""Sfm tools accepted by find_tool_feature_matcher_combination."""
+FeatureType = Literal[
+    "any",
+    "sift",
+    "superpoint",
+    "superpoint_aachen",
+    "superpoint_max",
+    "superpoint_inloc",
+    "r2d2",
+    "d2net-ss",
+    "sosnet",
+    "disk",
+]
+"""Feature types accepted by find_tool_feature_matcher_combination."""
+MatcherType = Literal[
+    "any",
+    "NN",
+    "superglue",
+    "superglue-fast",
+    "NN-superpoint",
+    "NN-ratio",
+    "NN-mutual",
+    "adalam",
+    "disk+lightglue",
+    "superpoint+lightglue",
+]
+"""Matcher types accepted by find_tool_feature_matcher_combination."""
+ToolFeatureMatcherCombination = Union[
     Tuple[None, None, None],
     Tuple[
         Literal["colmap", "hloc"],
@@ -541,7 +915,15 @@ def find_tool_feature_matcher_combination(
             "superpoint+lightglue",
         ],
     ],
-]:
+]
+"""Valid combination returned by find_tool_feature_matcher_combination, or Nones if there is none."""
+
+
+def find_tool_feature_matcher_combination(
+    sfm_tool: SfmTool,
+    feature_type: FeatureType,
+    matcher_type: MatcherType,
+) -> ToolFeatureMatcherCombination:
     """Find a valid combination of sfm tool, feature type, and matcher type.
     Basically, replace the default parameters 'any' by usable value
 
@@ -554,6 +936,16 @@ def find_tool_feature_matcher_combination(
         Tuple of sfm tool, feature type, and matcher type.
         Returns (None,None,None) if no valid combination can be found
     """
+    return cast(
+        ToolFeatureMatcherCombination,
+        _TOOL_FEATURE_MATCHER_COMBINATIONS.get((sfm_tool, feature_type, matcher_type), (None, None, None)),
+    )
+
+
+def _resolve_tool_feature_matcher_combination(
+    sfm_tool: str, feature_type: str, matcher_type: str
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Resolves a combination for find_tool_feature_matcher_combination, which looks the result up in a table."""
     if sfm_tool == "any":
         if (feature_type in ("any", "sift")) and (matcher_type in ("any", "NN")):
             sfm_tool = "colmap"
@@ -577,6 +969,48 @@ def find_tool_feature_matcher_combination(
     return (None, None, None)
 
 
+# The arguments are Literals, so every combination is resolved once at import.
+_TOOL_FEATURE_MATCHER_COMBINATIONS: Dict[Tuple[str, str, str], Tuple[Optional[str], Optional[str], Optional[str]]] = {
+    combination: _resolve_tool_feature_matcher_combination(*combination)
+    for combination in itertools.product(get_args(SfmTool), get_args(FeatureType), get_args(MatcherType))
+}
+
+
+def _get_circle_mask_radius(height: int, width: int, percent_radius) -> Optional[int]:
+    """Returns the radius in pixels of a circle mask, or None if the radius is too large."""
+    if percent_radius <= 0.0:
+        CONSOLE.log("[bold red]:skull: The radius of the circle mask must be positive.")
+        sys.exit(1)
+    if percent_radius >= 1.0:
+        return None
+    return int(percent_radius * np.sqrt(width**2 + height**2) / 2.0)
+
+
+def _get_crop_mask_bounds(
+    height: int, width: int, crop_factor: Tuple[float, float, float, float]
+) -> Optional[Tuple[int, int, int, int]]:
+    """Returns the (top, bottom, left, right) pixel bounds of a crop mask, or None if no cropping is performed."""
+    if np.all(np.array(crop_factor) == 0.0):
+        return None
+    if np.any(np.array(crop_factor) < 0.0) or np.any(np.array(crop_factor) > 1.0):
+        CONSOLE.log("[bold red]Invalid crop percentage, must be between 0 and 1.")
+        sys.exit(1)
+    top, bottom, left, right = crop_factor
+    return int(top * height), height - int(bottom * height), int(left * width), width - int(right * width)
+
+
+def _fill_mask(height: int, width: int, crop_bounds: Tuple[int, int, int, int], radius: Optional[int]) -> np.ndarray:
+    """Fills a mask inside the crop bounds, evaluating the circle only within those bounds."""
+    mask = np.zeros((height, width), dtype=np.uint8)
+    top, bottom, left, right = crop_bounds
+    if radius is None:
+        mask[top:bottom, left:right] = 1
+    else:
+        yy, xx = np.ogrid[top:bottom, left:right]
+        mask[top:bottom, left:right] = (xx - width // 2) ** 2 + (yy - height // 2) ** 2 <= radius**2
+    return mask
+
+
 def generate_circle_mask(height: int, width: int, percent_radius) -> Optional[np.ndarray]:
     """generate a circle mask of the given size.
 
@@ -588,16 +1022,10 @@ def generate_circle_mask(height: int, width: int, percent_radius) -> Optional[np
     Returns:
         The mask or None if the radius is too large.
     """
-    if percent_radius <= 0.0:
-        CONSOLE.log("[bold red]:skull: The radius of the circle mask must be positive.")
-        sys.exit(1)
-    if percent_radius >= 1.0:
+    radius = _get_circle_mask_radius(height, width, percent_radius)
+    if radius is None:
         return None
-    mask = np.zeros((height, width), dtype=np.uint8)
-    center = (width // 2, height // 2)
-    radius = int(percent_radius * np.sqrt(width**2 + height**2) / 2.0)
-    cv2.circle(mask, center, radius, 1, -1)  # type: ignore
-    return mask
+    return _fill_mask(height, width, (0, height, 0, width), radius)
 
 
 def generate_crop_mask(height: int, width: int, crop_factor: Tuple[float, float, float, float]) -> Optional[np.ndarray]:
@@ -611,19 +1039,10 @@ def generate_crop_mask(height: int, width: int, crop_factor: Tuple[float, float,
     Returns:
         The mask or None if no cropping is performed.
     """
-    if np.all(np.array(crop_factor) == 0.0):
+    crop_bounds = _get_crop_mask_bounds(height, width, crop_factor)
+    if crop_bounds is None:
         return None
-    if np.any(np.array(crop_factor) < 0.0) or np.any(np.array(crop_factor) > 1.0):
-        CONSOLE.log("[bold red]Invalid crop percentage, must be between 0 and 1.")
-        sys.exit(1)
-    top, bottom, left, right = crop_factor
-    mask = np.zeros((height, width), dtype=np.uint8)
-    top = int(top * height)
-    bottom = int(bottom * height)
-    left = int(left * width)
-    right = int(right * width)
-    mask[top : height - bottom, left : width - right] = 1.0
-    return mask
+    return _fill_mask(height, width, crop_bounds, None)
 
 
 def generate_mask(
@@ -643,13 +1062,12 @@ def generate_mask(
     Returns:
         The mask or None if no mask is needed.
     """
-    crop_mask = generate_crop_mask(height, width, crop_factor)
-    circle_mask = generate_circle_mask(height, width, percent_radius)
-    if crop_mask is None:
-        return circle_mask
-    if circle_mask is None:
-        return crop_mask
-    return crop_mask * circle_mask
+    crop_bounds = _get_crop_mask_bounds(height, width, crop_factor)
+    radius = _get_circle_mask_radius(height, width, percent_radius)
+    if crop_bounds is None and radius is None:
+        return None
+    # Both masks are combined in a single pass rather than multiplying two full-size masks.
+    return _fill_mask(height, width, crop_bounds or (0, height, 0, width), radius)
 
 
 def save_mask(
@@ -678,17 +1096,25 @@ def save_mask(
     mask *= 255
     mask_path = image_dir.parent / "masks"
     mask_path.mkdir(exist_ok=True)
-    cv2.imwrite(str(mask_path / "mask.png"), mask)
+    mask_paths = [mask_path / "mask.png"]
+    masks = [mask]
     downscale_factors = [2**i for i in range(num_downscales + 1)[1:]]
+    # Nearest neighbor pyramid; each level is decimated from the previous one instead of the full resolution mask.
+    mask_i = mask
     for downscale in downscale_factors:
         mask_path_i = image_dir.parent / f"masks_{downscale}"
         mask_path_i.mkdir(exist_ok=True)
-        mask_path_i = mask_path_i / "mask.png"
-        mask_i = cv2.resize(
-            mask,
-            (width // downscale, height // downscale),
-            interpolation=cv2.INTER_NEAREST,
-        )
-        cv2.imwrite(str(mask_path_i), mask_i)
+        mask_paths.append(mask_path_i / "mask.png")
+        mask_i = mask_i[::2, ::2][: height // downscale, : width // downscale]
+        masks.append(mask_i)
+
+    def write_mask(mask_path_i: Path, mask_i: np.ndarray) -> None:
+        # Binary masks compress well even at the fastest compression level.
+        success, buffer = cv2.imencode(".png", mask_i, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        assert success
+        mask_path_i.write_bytes(buffer.tobytes())
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(write_mask, mask_paths, masks))
     CONSOLE.log(":tada: Generated and saved masks.")
     return mask_path / "mask.png"
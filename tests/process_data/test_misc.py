@@ -3,12 +3,15 @@ Test misc data utils
 """
 
 import os
+import random
 import re
+import shutil
 from pathlib import Path
 from unittest import mock
 
 import cv2
 import numpy as np
+import pytest
 from PIL import Image
 from pyquaternion import Quaternion
 from scipy.spatial.transform import Rotation
@@ -16,7 +19,17 @@ from scipy.spatial.transform import Rotation
 # TODO(1480) use pycolmap instead of colmap_parsing_utils
 # import pycolmap
 from nerfstudio.data.utils.colmap_parsing_utils import qvec2rotmat
-from nerfstudio.process_data.process_data_utils import convert_video_to_images
+from nerfstudio.process_data.process_data_utils import (
+    _TOOL_FEATURE_MATCHER_COMBINATIONS,
+    _copy_file,
+    _downscale_image,
+    _resolve_tool_feature_matcher_combination,
+    convert_video_to_images,
+    copy_images_list,
+    find_tool_feature_matcher_combination,
+    get_num_frames_in_video,
+    list_images,
+)
 
 
 def test_scalar_first_scalar_last_quaternions():
@@ -91,12 +104,12 @@ def test_process_video_conversion_with_seed(tmp_path: Path):
             out.write(frame)
         out.release()
 
-    def extract_frame_numbers(ffmpeg_command: str):
-        """Extracts the frame numbers from the ffmpeg command"""
+    def extract_frame_numbers(call_args_list):
+        """Extracts the frame numbers from the seek times of the per-frame ffmpeg commands (at 1 frame per second)"""
 
-        pattern = r"eq\(n\\,(\d+)\)"
-        matches = re.findall(pattern, ffmpeg_command)
-        frame_numbers = [int(match) for match in matches]
+        pattern = r"-ss (\d+\.\d+)"
+        matches = [re.search(pattern, call_args[0][0]) for call_args in call_args_list]
+        frame_numbers = sorted(int(float(match[1]) + 0.5) for match in matches if match is not None)
         return frame_numbers
 
     # Create a video directory with path video
@@ -129,8 +142,12 @@ def test_process_video_conversion_with_seed(tmp_path: Path):
     (tmp_path / "mocked_bin" / "colmap").touch(mode=0o777)
     (tmp_path / "mocked_bin" / "ffmpeg").touch(mode=0o777)
 
-    # Return value of 10 for the get_num_frames_in_video run_command call
-    with mock.patch("nerfstudio.process_data.process_data_utils.run_command", return_value="10") as mock_run_func:
+    # Return value of 1000 frames at a constant 1 frame per second for the ffprobe run_command call, so that the
+    # selected frames are sparse enough to seek to
+    with mock.patch(
+        "nerfstudio.process_data.process_data_utils.run_command",
+        return_value="nb_frames=1000\navg_frame_rate=1/1\nr_frame_rate=1/1",
+    ) as mock_run_func:
         summary_log, extracted_frame_count = convert_video_to_images(
             video_path=video_path,
             image_dir=image_output_dir,
@@ -140,8 +157,9 @@ def test_process_video_conversion_with_seed(tmp_path: Path):
             verbose=False,
             random_seed=42,
         )
-        assert mock_run_func.call_count == 2, f"Expected 2 calls, but got {mock_run_func.call_count}"
-        first_frames = extract_frame_numbers(mock_run_func.call_args[0][0])
+        # One ffprobe call, then one ffmpeg call per extracted frame
+        assert mock_run_func.call_count == 6, f"Expected 6 calls, but got {mock_run_func.call_count}"
+        first_frames = extract_frame_numbers(mock_run_func.call_args_list[-5:])
         assert len(first_frames) == 5, f"Expected 5 frames, but got {len(first_frames)}"
 
         summary_log, extracted_frame_count = convert_video_to_images(
@@ -154,8 +172,9 @@ def test_process_video_conversion_with_seed(tmp_path: Path):
             random_seed=42,
         )
 
-        assert mock_run_func.call_count == 4, f"Expected 4 total calls, but got {mock_run_func.call_count}"
-        second_frames = extract_frame_numbers(mock_run_func.call_args[0][0])
+        # The probed stream of the unchanged video is cached, so only ffmpeg runs again
+        assert mock_run_func.call_count == 11, f"Expected 11 total calls, but got {mock_run_func.call_count}"
+        second_frames = extract_frame_numbers(mock_run_func.call_args_list[-5:])
         assert len(second_frames) == 5, f"Expected 5 frames, but got {len(first_frames)}"
         assert first_frames == second_frames
 
@@ -169,7 +188,242 @@ def test_process_video_conversion_with_seed(tmp_path: Path):
             random_seed=52,
         )
 
-        assert mock_run_func.call_count == 6, f"Expected 6 total calls, but got {mock_run_func.call_count}"
-        third_frames = extract_frame_numbers(mock_run_func.call_args[0][0])
+        assert mock_run_func.call_count == 16, f"Expected 16 total calls, but got {mock_run_func.call_count}"
+        third_frames = extract_frame_numbers(mock_run_func.call_args_list[-5:])
         assert len(third_frames) == 5, f"Expected 5 frames, but got {len(first_frames)}"
         assert first_frames != third_frames
+
+    # Variable frame rate videos can't seek to frames by index, and dense selections are cheaper to decode linearly,
+    # so both are selected in a single ffmpeg call
+    for stream_info, num_video_frames in (
+        ("nb_frames=1000\navg_frame_rate=9/10\nr_frame_rate=1/1", 1000),
+        ("nb_frames=100\navg_frame_rate=1/1\nr_frame_rate=1/1", 100),
+    ):
+        video_path.write_bytes(video_path.read_bytes() + b"\0")
+        with mock.patch(
+            "nerfstudio.process_data.process_data_utils.run_command", return_value=stream_info
+        ) as mock_run_func:
+            convert_video_to_images(
+                video_path=video_path,
+                image_dir=image_output_dir,
+                num_frames_target=num_frames_target,
+                num_downscales=num_downscales,
+                crop_factor=crop_factor,
+                verbose=False,
+                random_seed=42,
+            )
+            assert mock_run_func.call_count == 2, f"Expected 2 calls, but got {mock_run_func.call_count}"
+            assert "-ss" not in mock_run_func.call_args[0][0]
+            random.seed(42)
+            frame_indices = sorted(random.sample(range(num_video_frames), num_frames_target))
+            assert "select='" + "+".join([f"eq(n\\,{idx})" for idx in frame_indices]) in mock_run_func.call_args[0][0]
+
+
+def test_get_num_frames_in_video(tmp_path: Path):
+    """
+    Test get_num_frames_in_video reads the stream header and only counts packets as a last resort.
+    """
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"header")
+
+    outputs = {
+        "nb_frames": "avg_frame_rate=30/1\nduration=10.000000\nnb_frames=300\n",
+        "duration": "avg_frame_rate=30000/1001\nduration=10.010000\nnb_frames=N/A\n",
+        "count_packets": "avg_frame_rate=0/0\nduration=N/A\nnb_frames=N/A\n",
+    }
+    for case, expected in (("nb_frames", 300), ("duration", 300), ("count_packets", 42)):
+        video_path.write_bytes(case.encode())
+        with mock.patch(
+            "nerfstudio.process_data.process_data_utils.run_command", side_effect=[outputs[case], "42\n"]
+        ) as mock_run_func:
+            assert get_num_frames_in_video(video_path) == expected
+            assert mock_run_func.call_count == (2 if case == "count_packets" else 1)
+            # Unchanged videos are served from the cache
+            assert get_num_frames_in_video(video_path) == expected
+            assert mock_run_func.call_count == (2 if case == "count_packets" else 1)
+
+
+def test_copy_file(tmp_path: Path):
+    """
+    Test _copy_file copies the full contents, including when copy_file_range stops early.
+    """
+    src = tmp_path / "src.jpg"
+    src.write_bytes(os.urandom(100_000))
+
+    dst = tmp_path / "dst.jpg"
+    _copy_file(src, dst)
+    assert dst.read_bytes() == src.read_bytes()
+
+    # copy_file_range copying nothing must not leave a truncated file behind
+    partial = tmp_path / "partial.jpg"
+    with mock.patch("os.copy_file_range", return_value=0, create=True) as mock_copy_file_range:
+        _copy_file(src, partial)
+        assert mock_copy_file_range.call_count == 1
+    assert partial.read_bytes() == src.read_bytes()
+
+    with pytest.raises(shutil.SameFileError):
+        _copy_file(src, src)
+    assert src.read_bytes() == dst.read_bytes()
+
+
+def test_list_images(tmp_path: Path):
+    """
+    Test list_images skips hidden files, directories named like images and symlinked directories.
+    """
+    image_dir = tmp_path / "images"
+    (image_dir / "nested").mkdir(parents=True)
+    (image_dir / "x.jpg").mkdir()
+    for name in ("b.png", "a.JPG", ".hidden.jpg", "notes.txt", "nested/c.jpeg", "x.jpg/d.tif"):
+        (image_dir / name).touch()
+    (image_dir / "link").symlink_to(image_dir / "nested", target_is_directory=True)
+    (image_dir / "nested" / "loop").symlink_to(image_dir, target_is_directory=True)
+    (image_dir / "e.png").symlink_to(image_dir / "b.png")
+
+    expected = ["a.JPG", "b.png", "e.png", "nested/c.jpeg", "x.jpg/d.tif"]
+    assert [path.relative_to(image_dir).as_posix() for path in list_images(image_dir)] == expected
+    assert [path.name for path in list_images(image_dir, recursive=False)] == ["a.JPG", "b.png", "e.png"]
+    assert list_images(tmp_path / "missing") == []
+
+    # Unreadable directories are skipped
+    scandir = os.scandir
+
+    def unreadable_nested_scandir(path):
+        if Path(path) == image_dir / "nested":
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    with mock.patch("os.scandir", side_effect=unreadable_nested_scandir):
+        assert [path.relative_to(image_dir).as_posix() for path in list_images(image_dir)] == [
+            "a.JPG",
+            "b.png",
+            "e.png",
+            "x.jpg/d.tif",
+        ]
+
+
+def test_downscale_image(tmp_path: Path):
+    """
+    Test _downscale_image upscales, crops and downscales images in-process.
+    """
+    image = np.random.default_rng(0).integers(0, 256, size=(8, 12, 3), dtype=np.uint8)
+    image_path = tmp_path / "image.png"
+    cv2.imwrite(str(image_path), image)
+
+    output_paths = [tmp_path / f"out_{i}.png" for i in range(3)]
+    _downscale_image(image_path, output_paths, [1, 2, 4], crop_border_pixels=2, upscale_factor=2)
+    outputs = [cv2.imread(str(output_path), cv2.IMREAD_UNCHANGED) for output_path in output_paths]
+    assert [output.shape for output in outputs] == [(12, 20, 3), (6, 10, 3), (3, 5, 3)]
+    # Each pixel was upscaled to a 2x2 block and the crop is block-aligned, so halving restores the original pixels
+    assert np.array_equal(outputs[0], np.repeat(np.repeat(image[1:7, 1:11], 2, axis=0), 2, axis=1))
+    assert np.array_equal(outputs[1], image[1:7, 1:11])
+    # Area interpolation averages each 2x2 block of original pixels
+    block_means = image[1:7, 1:11].reshape(3, 2, 5, 2, 3).mean(axis=(1, 3))
+    assert np.abs(outputs[2] - block_means).max() <= 1
+
+    _downscale_image(image_path, output_paths[:2], [1, 2], nearest_neighbor=True, crop_factor=(0.25, 0.25, 0.0, 0.5))
+    outputs = [cv2.imread(str(output_path), cv2.IMREAD_UNCHANGED) for output_path in output_paths[:2]]
+    assert np.array_equal(outputs[0], image[2:6, 0:6])
+    assert outputs[1].shape == (2, 3, 3)
+    assert np.isin(outputs[1], image[2:6, 0:6]).all()
+
+    unreadable_path = tmp_path / "unreadable.png"
+    unreadable_path.write_bytes(b"not an image")
+    with pytest.raises(SystemExit):
+        _downscale_image(unreadable_path, output_paths[:1], [1])
+
+
+def test_find_tool_feature_matcher_combination():
+    """
+    Test the precomputed combination table agrees with resolving each combination directly.
+    """
+    assert len(_TOOL_FEATURE_MATCHER_COMBINATIONS) == 3 * 10 * 10
+    for combination in _TOOL_FEATURE_MATCHER_COMBINATIONS:
+        assert find_tool_feature_matcher_combination(*combination) == _resolve_tool_feature_matcher_combination(
+            *combination
+        )
+
+    assert find_tool_feature_matcher_combination("any", "any", "any") == ("colmap", "sift", "NN")
+    assert find_tool_feature_matcher_combination("any", "superpoint", "NN") == (
+        "hloc",
+        "superpoint_aachen",
+        "NN-mutual",
+    )
+    assert find_tool_feature_matcher_combination("hloc", "disk", "any") == ("hloc", "disk", "superpoint+lightglue")
+    assert find_tool_feature_matcher_combination("colmap", "disk", "any") == (None, None, None)
+
+
+def test_copy_images_list_skips_noop_downscale(tmp_path: Path):
+    """
+    Test copy_images_list doesn't decode the copied images when there is nothing to crop or rescale.
+    """
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    image_path = data_dir / "a.png"
+    cv2.imwrite(str(image_path), np.zeros((4, 6, 3), dtype=np.uint8))
+
+    with mock.patch("nerfstudio.process_data.process_data_utils._downscale_image") as mock_downscale_image:
+        copy_images_list([image_path], tmp_path / "images", num_downscales=0)
+        assert mock_downscale_image.call_count == 0
+        copy_images_list([image_path], tmp_path / "images", num_downscales=1)
+        assert mock_downscale_image.call_count == 1
+    assert (tmp_path / "images" / "frame_00001.png").read_bytes() == image_path.read_bytes()
+
+
+def test_copy_images_list_ffmpeg_groups(tmp_path: Path):
+    """
+    Test copy_images_list batches images of mixed dimensions by size and format when downscaling with ffmpeg.
+    """
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    image_paths = []
+    for name, (height, width) in (("a.png", (4, 6)), ("b.jpg", (4, 6)), ("c.jpg", (4, 6)), ("d.jpg", (6, 4))):
+        image_paths.append(data_dir / name)
+        cv2.imwrite(str(image_paths[-1]), np.zeros((height, width, 3), dtype=np.uint8))
+
+    downscale_cmds = []
+    concat_lists = []
+
+    def fake_run_command(cmd: str, verbose=False):
+        copy_match = re.search(r"-i (\S+) -metadata:s:v:0 rotate=0 (\S+)", cmd)
+        if copy_match is not None:
+            # Autorotation of the input image
+            shutil.copyfile(copy_match[1], copy_match[2])
+            return ""
+        downscale_cmds.append(cmd)
+        concat_match = re.search(r'-f concat -safe 0 -i "([^"]+)"', cmd)
+        if concat_match is not None:
+            concat_lists.append(Path(concat_match[1]).read_text())
+            inputs = re.findall(r"file '([^']+)'", concat_lists[-1])
+        else:
+            inputs = [re.search(r'-i "([^"]+)"', cmd)[1]]
+        # Write the input each output frame came from, so the final names can be traced back
+        for output in re.findall(r'-map "\[out\d\]" -q:v 2 "([^"]+)"', cmd):
+            for framenum, input_path in enumerate(inputs, start=1):
+                Path(output % framenum).write_text(Path(input_path).name)
+        return ""
+
+    image_dir = tmp_path / "images"
+    with mock.patch("nerfstudio.process_data.process_data_utils.run_command", side_effect=fake_run_command):
+        copied_image_paths = copy_images_list(
+            image_paths, image_dir, num_downscales=1, same_dimensions=False, use_ffmpeg=True
+        )
+
+    expected_names = ["frame_00001.png", "frame_00002.jpg", "frame_00003.jpg", "frame_00004.jpg"]
+    assert [path.name for path in copied_image_paths] == expected_names
+    # The same-size jpgs share a concat group; the png and the differently sized jpg are singletons
+    assert len(downscale_cmds) == 3
+    assert concat_lists == [
+        f"file '{(image_dir / 'frame_00002.jpg').absolute()}'\nfile '{(image_dir / 'frame_00003.jpg').absolute()}'\n"
+    ]
+    singleton_cmds = sorted(cmd for cmd in downscale_cmds if "-f concat" not in cmd)
+    assert [re.search(r'-i "([^"]+)"', cmd)[1] for cmd in singleton_cmds] == [
+        str(image_dir / "frame_00001.png"),
+        str(image_dir / "frame_00004.jpg"),
+    ]
+    # Each group is encoded back to its own format
+    assert "%05d.png" in singleton_cmds[0] and "%05d.jpg" not in singleton_cmds[0]
+    assert "%05d.jpg" in singleton_cmds[1] and "%05d.png" not in singleton_cmds[1]
+    for output_dir in (image_dir, tmp_path / "images_2"):
+        assert sorted(path.name for path in output_dir.iterdir()) == expected_names
+        for name in expected_names:
+            assert (output_dir / name).read_text() == name